@@ -25,11 +25,19 @@ import psycopg2
 import psycopg2.extras
 import time
 import datetime
+import threading
+import contextlib
+import collections
+import hashlib
+import pickle
+import tempfile
+import math
 # o módulo numpy é utilizado para calcular média e desvio padrão
 from numpy import mean, std
 
 # módulos da interface gráfica Qt5
-from PyQt5.QtCore import QDir, Qt
+from PyQt5.QtCore import (QDir, Qt, QObject, QRunnable, QThreadPool, QTimer,
+                          pyqtSignal)
 from PyQt5.QtGui import QFont, QPalette, QColor, QIcon
 
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QTableWidget,QTableWidgetItem,
@@ -37,7 +45,8 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QTableWidget,QTableWidgetItem
                              QColorDialog, QDialog, QErrorMessage, QFileDialog,
                              QFontDialog, QFrame, QGridLayout, QGroupBox, QSizePolicy,  
                              QInputDialog, QLabel, QLineEdit, QMessageBox, QPushButton,
-                             QRadioButton, QComboBox, QDockWidget, QSpinBox)
+                             QRadioButton, QComboBox, QDockWidget, QSpinBox,
+                             QProgressBar)
 
 # os graficos sao gerados utilizando a biblioteca matplotlib
 import matplotlib.pyplot as plt
@@ -59,6 +68,28 @@ caminhoCorrente = config['BancoResultados']['caminhoCorrente']
 caminhoRegistroTensao = config['BancoResultados']['caminhoRegistroTensao']
 caminhoRegistroCorrente = config['BancoResultados']['caminhoRegistroCorrente']
 passwordResultados = config['BancoResultados']['password']
+# busca agrupada: todas as leituras do ponto (VALPROG/FAIXA792) são buscadas em uma
+# única consulta e agrupadas por CODPONTO, em vez de uma consulta por frequência
+buscaAgrupada = config.getboolean('BancoResultados', 'buscaAgrupada', fallback=True)
+
+# pool de conexões com o banco de condições ambientais
+# quantidade máxima de conexões abertas simultaneamente
+maxConexoesCondicoesAmbientais = config.getint('BancoCondicoesAmbientais', 'maxConexoes', fallback=4)
+# tempo (em segundos) em que uma conexão pode ficar ociosa sem ser testada antes do uso
+tempoVerificacaoConexao = config.getfloat('BancoCondicoesAmbientais', 'tempoVerificacao', fallback=30)
+
+# cache local dos resultados (Valmed / Leituras) de cada registro
+cacheAtivo = config.getboolean('Cache', 'ativo', fallback=True)
+# diretório do cache; se não configurado, utiliza a pasta de dados locais do usuário
+caminhoCache = config.get('Cache', 'caminho', fallback='')
+if caminhoCache == '':
+    caminhoCache = os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), 'buscarLeituras', 'cache')
+# tamanho máximo do cache, em MB
+tamanhoMaximoCache = config.getfloat('Cache', 'tamanhoMaximo', fallback=50)
+
+# tempo limite (em segundos) para a busca das leituras e condições ambientais
+# (também é o tempo limite de cada consulta aos bancos de dados)
+tempoLimiteBusca = config.getfloat('Interface', 'tempoLimiteBusca', fallback=120)
 
 # flag grandezaTensao => determina se a grandeza em uso é tensão ou corrente
 # tensão: True
@@ -77,6 +108,15 @@ class App(QMainWindow):
         # título da janela principal
         self.setWindowTitle(__appname__+" - versão "+__version__)
         self.caminho = caminhoTensao  # valor default do caminho do banco de dados
+
+        # as buscas no banco de dados são executadas em segundo plano, uma de cada vez
+        self.threadPool = QThreadPool()
+        self.threadPool.setMaxThreadCount(1)
+        self.tarefa = None   # tarefa de busca em andamento
+        # temporizador do tempo limite da busca
+        self.timerBusca = QTimer(self)
+        self.timerBusca.setSingleShot(True)
+        self.timerBusca.timeout.connect(self.tempoLimiteExcedido)
         
         # criar dock widgets
         self.createDockCondicoesAmbientais()
@@ -102,14 +142,19 @@ class App(QMainWindow):
             "Deseja fechar o programa?", QMessageBox.Yes, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            # testa se a conexão ao banco de dados está aberta
+            # testa se existe um registro aberto
             try:
-                self.resultados.conn
+                self.resultados
             except:
                 pass
             else:
+                # cancela a busca em andamento e aguarda a thread terminar
+                self.cancelarBusca()
+                self.threadPool.waitForDone(5000)
                 # se a conexão está aberta, fechar
-                self.resultados.conn.close()
+                self.resultados.fechar()
+            # fechar as conexões com o banco de condições ambientais
+            fecharPoolCondicoesAmbientais()
             # fechar o programa
             event.accept()
         else:
@@ -177,6 +222,8 @@ class App(QMainWindow):
                 "All Files (*);;Text Files (*.txt)", options=options)
         if fileName:
             self.openRegistroLabel.setText(fileName)
+            # descarta a busca em andamento do registro anterior
+            self.cancelarBusca()
             # salva na variável registro apenas o nome do registro
             self.registro = os.path.split(fileName)[-1]
             # limpar campos
@@ -332,9 +379,19 @@ class App(QMainWindow):
         self.acoesGroupBox = QGroupBox("Ações")
 
         self.buscarLeituras = self.createButton("Buscar Leituras", self.buscarLeituras)
+        self.cancelar = self.createButton("Cancelar", self.cancelarBusca)
+        self.cancelar.setEnabled(False)
+
+        # barra de progresso da busca
+        self.progressoBusca = QProgressBar()
+        self.progressoBusca.setRange(0, 100)
+        self.progressoBusca.setValue(0)
+        self.progressoBusca.setFormat("")
         
         acoesGroupBoxLayout = QHBoxLayout()
         acoesGroupBoxLayout.addWidget(self.buscarLeituras)
+        acoesGroupBoxLayout.addWidget(self.cancelar)
+        acoesGroupBoxLayout.addWidget(self.progressoBusca)
 
         self.acoesGroupBox.setLayout(acoesGroupBoxLayout)
 
@@ -380,6 +437,8 @@ class App(QMainWindow):
     # handler do radio button que seleciona tensão ou corrente
     def btnstate(self, b):
         global grandezaTensao
+        if b.isChecked() == True:
+            self.cancelarBusca()
         if b.text() == "Tensão":
             if b.isChecked() == True:
                 self.caminho = caminhoTensao
@@ -414,15 +473,82 @@ class App(QMainWindow):
                 self.registro = ""
                 grandezaTensao = False
 
-    # funcao buscar leituras, chamada através do botão da interface gráfica                                               
+    # funcao buscar leituras, chamada através do botão da interface gráfica
+    # a busca é executada em segundo plano; a tabela é preenchida quando os resultados chegam
     def buscarLeituras(self):
-        # coloca o cursor em espera
-        QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
-            valmed = self.valmedSelect.currentText().replace(',','.')
-            faixa792 = self.faixa792Select.currentText().replace(',','.')
-            self.resultados.getDiferencas(valmed, faixa792)
-            
+            self.resultados
+        except AttributeError:
+            QMessageBox.critical(self, "Erro", "Nenhum registro aberto!", QMessageBox.Abort)
+            return
+
+        valmed = self.valmedSelect.currentText().replace(',','.')
+        faixa792 = self.faixa792Select.currentText().replace(',','.')
+
+        self.tarefa = TarefaBuscarLeituras(self.resultados, valmed, faixa792)
+        self.tarefa.sinais.progresso.connect(self.progressoTarefa)
+        self.tarefa.sinais.concluido.connect(self.buscaConcluida)
+        self.tarefa.sinais.erro.connect(self.erroBusca)
+
+        self.buscarLeituras.setEnabled(False)
+        self.cancelar.setEnabled(True)
+        self.progressoBusca.setValue(0)
+        if self.threadPool.activeThreadCount() > 0:
+            # a consulta anterior (por exemplo, de uma busca cancelada) ainda não retornou
+            self.progressoBusca.setFormat("Aguardando o fim da consulta anterior...")
+        else:
+            self.progressoBusca.setFormat("Aguardando...")
+        self.threadPool.start(self.tarefa)
+        if tempoLimiteBusca > 0:
+            self.timerBusca.start(int(tempoLimiteBusca * 1000))
+
+    # cancela a busca em andamento
+    # a consulta em execução não é interrompida, mas o seu resultado é descartado; a próxima busca
+    # aguarda o fim da consulta, limitada pelo tempo limite das consultas (ver tempoLimiteBusca)
+    def cancelarBusca(self):
+        if self.tarefa is not None:
+            self.tarefa.cancelar()
+            self.tarefa = None
+            self.finalizarBusca("Cancelado")
+
+    def tempoLimiteExcedido(self):
+        if self.tarefa is not None:
+            self.cancelarBusca()
+            QMessageBox.critical(self, "Erro",
+                "Tempo limite da busca excedido!",
+                QMessageBox.Abort)
+
+    # restaura os botões e a barra de progresso ao final da busca
+    def finalizarBusca(self, mensagem):
+        self.timerBusca.stop()
+        self.buscarLeituras.setEnabled(True)
+        self.cancelar.setEnabled(False)
+        self.progressoBusca.setValue(0)
+        self.progressoBusca.setFormat(mensagem)
+
+    # sinais emitidos pela tarefa de busca
+    # sinais de tarefas canceladas (diferentes da tarefa atual) são ignorados
+    def progressoTarefa(self, valor, mensagem):
+        if self.tarefa is None or self.sender() is not self.tarefa.sinais:
+            return
+        self.progressoBusca.setValue(valor)
+        self.progressoBusca.setFormat(mensagem)
+
+    def erroBusca(self, mensagem):
+        if self.tarefa is None or self.sender() is not self.tarefa.sinais:
+            return
+        self.tarefa = None
+        self.finalizarBusca("Erro")
+        QMessageBox.critical(self, "Erro",
+            "Erro ao conectar com o Banco de Dados!",
+            QMessageBox.Abort)
+
+    def buscaConcluida(self, erroCondicoesAmbientais):
+        if self.tarefa is None or self.sender() is not self.tarefa.sinais:
+            return
+        self.tarefa = None
+        self.finalizarBusca("Concluído")
+        try:
             colunasTabela = self.resultados.colunas + 1   # uma coluna extra para labels
             linhasTabela = self.resultados.linhas + 7     # linhas extras: espaco, media, desvio padrao, espaco, data, hora
             
@@ -515,21 +641,18 @@ class App(QMainWindow):
                             self.tableWidget.item(linha, coluna).setFlags(Qt.ItemIsEnabled)
             # depois de montar a tabela, pinta as colunas de frequencias repetidas não selecionadas de cinza
             self.pintarColuna()
-            try:
-                self.resultados.getCondicoesAmbientais()
+            if erroCondicoesAmbientais:
+                QMessageBox.critical(self, "Erro",
+                "Erro ao buscar as condições ambientais!",
+                QMessageBox.Abort)
+            else:
                 self.temperaturaMedia.setText(self.resultados.temperaturaMedia)
                 self.umidadeMedia.setText(self.resultados.umidadeMedia)
                 self.plotWidget.plot(self.resultados.date, self.resultados.temperature, self.resultados.humidity)
-            except:
-                QMessageBox.critical(self, "Erro",
-                "Erro ao buscar as condições ambientais!",
-                QMessageBox.Abort)         
 
             self.tableWidget.itemClicked.connect(self.handleItemClicked)
-            QApplication.restoreOverrideCursor()
          
         except:
-                QApplication.restoreOverrideCursor()
                 QMessageBox.critical(self, "Erro",
                 "Erro ao conectar com o Banco de Dados!",
                 QMessageBox.Abort)         
@@ -796,6 +919,118 @@ class App(QMainWindow):
             except:
                 QMessageBox.critical(self, "Erro", "Nenhum registro aberto!", QMessageBox.Abort)      
 
+# identificação do registro (tabela Resultados)
+IdRegistro = collections.namedtuple('IdRegistro', ['CODREG', 'CODOBJ', 'OPERADOR'])
+# ponto de medição (tabela Valmed)
+PontoValmed = collections.namedtuple('PontoValmed', ['FREQ', 'CODPONTO', 'CODI', 'DATACAL', 'HORACAL'])
+
+# cache em disco dos resultados buscados no banco de dados MS Access
+class CacheResultados(object):
+    """ Classe que armazena em disco os resultados de cada registro
+    Cada entrada é um arquivo pickle, invalidado quando a data de modificação ou o tamanho
+    do banco de dados mudam. Quando o tamanho total ultrapassa o limite, as entradas
+    menos usadas recentemente são removidas (a data de modificação do arquivo marca o último uso).
+    Atributos:
+    diretorio: diretório onde os arquivos do cache são gravados
+    tamanhoMaximo: tamanho máximo do cache, em bytes
+    """
+
+    versao = 1
+
+    def __init__(self, diretorio, tamanhoMaximo):
+        self.diretorio = diretorio
+        self.tamanhoMaximo = tamanhoMaximo
+        self.lock = threading.Lock()
+
+    def arquivo(self, chave):
+        nome = hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()
+        return os.path.join(self.diretorio, nome + '.pkl')
+
+    # identificação da versão do banco de dados: (data de modificação, tamanho)
+    def versaoBanco(self, caminhoBancoDados):
+        st = os.stat(caminhoBancoDados)
+        return (st.st_mtime, st.st_size)
+
+    # retorna os dados armazenados para a chave, ou None se não existirem ou estiverem desatualizados
+    def ler(self, chave, caminhoBancoDados):
+        arquivo = self.arquivo(chave)
+        try:
+            with open(arquivo, 'rb') as f:
+                entrada = pickle.load(f)
+            if (entrada['versao'] != self.versao or entrada['chave'] != chave or
+                    entrada['banco'] != self.versaoBanco(caminhoBancoDados)):
+                # entrada desatualizada: o banco de dados foi modificado
+                self.remover(arquivo)
+                return None
+            # marca o último uso da entrada (LRU)
+            os.utime(arquivo, None)
+            return entrada['dados']
+        except Exception:
+            return None
+
+    # grava os dados no cache de forma atômica e aplica o limite de tamanho
+    def gravar(self, chave, caminhoBancoDados, dados):
+        try:
+            entrada = {'versao': self.versao,
+                       'chave': chave,
+                       'banco': self.versaoBanco(caminhoBancoDados),
+                       'dados': dados}
+            with self.lock:
+                if not os.path.isdir(self.diretorio):
+                    os.makedirs(self.diretorio)
+                fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(entrada, f, pickle.HIGHEST_PROTOCOL)
+                os.replace(temporario, self.arquivo(chave))
+                self.limitarTamanho()
+        except Exception:
+            # falhas do cache não impedem a busca dos resultados
+            pass
+
+    # remove as entradas menos usadas recentemente até respeitar o tamanho máximo
+    def limitarTamanho(self):
+        entradas = []
+        total = 0
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith('.pkl'):
+                continue
+            arquivo = os.path.join(self.diretorio, nome)
+            try:
+                st = os.stat(arquivo)
+            except OSError:
+                continue
+            entradas.append((st.st_mtime, st.st_size, arquivo))
+            total += st.st_size
+        entradas.sort()
+        for mtime, tamanho, arquivo in entradas:
+            if total <= self.tamanhoMaximo:
+                break
+            self.remover(arquivo)
+            total -= tamanho
+
+    def remover(self, arquivo):
+        try:
+            os.remove(arquivo)
+        except OSError:
+            pass
+
+    # remove todas as entradas do cache
+    def limpar(self):
+        with self.lock:
+            if os.path.isdir(self.diretorio):
+                for nome in os.listdir(self.diretorio):
+                    if nome.endswith('.pkl'):
+                        self.remover(os.path.join(self.diretorio, nome))
+
+# cache da aplicação (None se desativado no settings.ini)
+_cacheResultados = None
+
+def obterCacheResultados():
+    global _cacheResultados
+    if cacheAtivo and _cacheResultados is None:
+        _cacheResultados = CacheResultados(caminhoCache, int(tamanhoMaximoCache * 1024 * 1024))
+    return _cacheResultados
+
 # classe que faz a busca dos resultados nos banco de dados
 class Resultados(object):
     """ Classe que busca os resultados no banco de dados MS Access
@@ -808,27 +1043,104 @@ class Resultados(object):
         self.passwd = passwordResultados
         self.caminhoBancoDados = caminhoBancoDados
         self.nomeRegistro = nomeRegistro
-        self.conn = pyodbc.connect(r'DRIVER={Microsoft Access Driver (*.mdb, *.accdb)}; DBQ='+self.caminhoBancoDados+';PWD='+self.passwd)
-        cur = self.conn.cursor()
-
-        self.id = cur.execute("SELECT CODREG, CODOBJ, OPERADOR FROM Resultados WHERE NOMEREG='"+self.nomeRegistro+"'").fetchone()
+        # contadores de consultas ao banco de dados (última chamada de getDiferencas e total)
+        # a contagem de cada chamada é feita por thread e o total é protegido por um lock, para
+        # que as consultas feitas em outras threads não alterem a contagem da busca
+        self.consultas = 0
+        self.consultasTotal = 0
+        self.contagemThread = threading.local()
+        self.lockContadores = threading.Lock()
+        # a conexão com o banco de dados só é aberta quando necessária (ver conectar)
+        self.conn = None
+        self.cache = obterCacheResultados()
+
+        # tenta obter o registro do cache local
+        dados = self.lerCache(None, None)
+        if dados is not None:
+            self.id = IdRegistro(*dados['id'])
+            self.valprog = dados['valprog']
+            return
+
+        cur = self.conectar().cursor()
+
+        self.id = self.executarConsulta(cur, "SELECT CODREG, CODOBJ, OPERADOR FROM Resultados WHERE NOMEREG='"+self.nomeRegistro+"'").fetchone()
 
         if grandezaTensao == True:
-            self.valprog = cur.execute("SELECT DISTINCT VALPROG, FAIXA792 FROM Valmed WHERE CODREG="+str(self.id.CODREG)).fetchall()
+            self.valprog = self.executarConsulta(cur, "SELECT DISTINCT VALPROG, FAIXA792 FROM Valmed WHERE CODREG="+str(self.id.CODREG)).fetchall()
         else:
-            self.valprog = cur.execute("SELECT DISTINCT VALPROG FROM Leituras WHERE CODREG="+str(self.id.CODREG)).fetchall()            
+            self.valprog = self.executarConsulta(cur, "SELECT DISTINCT VALPROG FROM Leituras WHERE CODREG="+str(self.id.CODREG)).fetchall()            
 
         cur.close()
 
+        self.id = IdRegistro(*self.id)
+        self.valprog = [tuple(val) for val in self.valprog]
+        self.gravarCache(None, None, {'id': tuple(self.id), 'valprog': self.valprog})
+
+    # abre a conexão com o banco de dados, se ainda não estiver aberta
+    def conectar(self):
+        if self.conn is None:
+            self.conn = pyodbc.connect(r'DRIVER={Microsoft Access Driver (*.mdb, *.accdb)}; DBQ='+self.caminhoBancoDados+';PWD='+self.passwd)
+            # tempo limite das consultas (em segundos inteiros), como o das condições ambientais
+            if tempoLimiteBusca > 0:
+                self.conn.timeout = int(math.ceil(tempoLimiteBusca))
+        return self.conn
+
+    # fecha a conexão com o banco de dados, se estiver aberta
+    def fechar(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # chave do cache local: (banco de dados, registro, grandeza, VALPROG, FAIXA792)
+    # VALPROG e FAIXA792 iguais a None identificam os dados do próprio registro
+    def chaveCache(self, valprog, faixa792):
+        return (os.path.normcase(os.path.abspath(self.caminhoBancoDados)), self.nomeRegistro,
+                grandezaTensao, valprog, faixa792)
+
+    def lerCache(self, valprog, faixa792):
+        if self.cache is None:
+            return None
+        return self.cache.ler(self.chaveCache(valprog, faixa792), self.caminhoBancoDados)
+
+    def gravarCache(self, valprog, faixa792, dados):
+        if self.cache is not None:
+            self.cache.gravar(self.chaveCache(valprog, faixa792), self.caminhoBancoDados, dados)
+
+    # executa uma consulta no banco de dados, contabilizando a quantidade de consultas realizadas
+    def executarConsulta(self, cur, sql):
+        self.contagemThread.consultas = getattr(self.contagemThread, 'consultas', 0) + 1
+        with self.lockContadores:
+            self.consultasTotal += 1
+        return cur.execute(sql)
+
     # funcao que busca as diferencas ac-dc no banco de dados
     def getDiferencas(self, valprog, faixa792):
-        cur = self.conn.cursor()
+        # contador de consultas realizadas nesta chamada (nesta thread)
+        self.contagemThread.consultas = 0
+
+        # tenta obter o ponto do cache local
+        dados = self.lerCache(valprog, faixa792)
+        if dados is not None:
+            self.registro_rows = [PontoValmed(*row) for row in dados['registro_rows']]
+            self.diferencas = dados['diferencas']
+            self.data = dados['data']
+            self.hora = dados['hora']
+            self.colunas = dados['colunas']
+            self.linhas = dados['linhas']
+            self.consultas = 0
+            return
+
+        cur = self.conectar().cursor()
 
         if grandezaTensao == True:
-            self.registro_rows = cur.execute("SELECT DISTINCT FREQ, CODPONTO, CODI, DATACAL, HORACAL FROM Valmed WHERE CODREG="+str(self.id.CODREG)+" AND VALPROG="+valprog+" AND FAIXA792="+faixa792+" ORDER BY DATACAL, HORACAL").fetchall()      
+            self.registro_rows = self.executarConsulta(cur, "SELECT DISTINCT FREQ, CODPONTO, CODI, DATACAL, HORACAL FROM Valmed WHERE CODREG="+str(self.id.CODREG)+" AND VALPROG="+valprog+" AND FAIXA792="+faixa792+" ORDER BY DATACAL, HORACAL").fetchall()
         else:
-           self.registro_rows = cur.execute("SELECT DISTINCT FREQ, CODPONTO, CODI, DATACAL, HORACAL FROM Valmed WHERE CODREG="+str(self.id.CODREG)+" AND VALPROG="+valprog+" ORDER BY DATACAL, HORACAL").fetchall() 
-        
+            self.registro_rows = self.executarConsulta(cur, "SELECT DISTINCT FREQ, CODPONTO, CODI, DATACAL, HORACAL FROM Valmed WHERE CODREG="+str(self.id.CODREG)+" AND VALPROG="+valprog+" ORDER BY DATACAL, HORACAL").fetchall()
+
+        # busca agrupada: uma única consulta para todos os pontos, agrupando as leituras por CODPONTO
+        if buscaAgrupada == True:
+            leiturasPorPonto = self.buscarLeiturasAgrupadas(cur, [row.CODPONTO for row in self.registro_rows])
+
         self.diferencas = dict()
         self.hora = dict()
         self.data = dict()
@@ -856,12 +1168,16 @@ class Resultados(object):
                     newFreqStr += ' ('+str(i)+')'
             except:
                 pass
-                            
-            self.diferencas[newFreqStr] = cur.execute("SELECT DIFERENCA FROM Leituras WHERE CODREG="+str(self.id.CODREG)+" AND CODPONTO ="+str(row.CODPONTO)).fetchall()
+
+            if buscaAgrupada == True:
+                self.diferencas[newFreqStr] = leiturasPorPonto.get(row.CODPONTO, [])
+            else:
+                self.diferencas[newFreqStr] = self.executarConsulta(cur, "SELECT DIFERENCA FROM Leituras WHERE CODREG="+str(self.id.CODREG)+" AND CODPONTO ="+str(row.CODPONTO)).fetchall()
             self.data[newFreqStr] = row.DATACAL.strftime("%d/%m/%y")
             self.hora[newFreqStr] = row.HORACAL.strftime("%H:%M")
 
         cur.close()
+        self.consultas = self.contagemThread.consultas
 
         # determinar tamanho da tabela
         self.colunas = len(self.diferencas)  # quantidade de colunas (frequencias)
@@ -869,8 +1185,31 @@ class Resultados(object):
         linhas_list = [len(v) for v in self.diferencas.values()]
         self.linhas = linhas_list[0]   # quantidade de linhas (repeticoes)
 
+        # grava o ponto no cache local, convertendo as linhas do pyodbc em tuplas
+        self.registro_rows = [PontoValmed(*row) for row in self.registro_rows]
+        self.diferencas = dict((freq, [tuple(row) for row in rows]) for freq, rows in self.diferencas.items())
+        self.gravarCache(valprog, faixa792, {'registro_rows': [tuple(row) for row in self.registro_rows],
+                                             'diferencas': self.diferencas,
+                                             'data': self.data,
+                                             'hora': self.hora,
+                                             'colunas': self.colunas,
+                                             'linhas': self.linhas})
+
         return
 
+    # busca as leituras de todos os pontos (CODPONTO) em uma única consulta
+    # retorna um dict CODPONTO => lista de linhas (DIFERENCA,), na ordem retornada pelo banco
+    def buscarLeiturasAgrupadas(self, cur, codpontos):
+        leiturasPorPonto = dict()
+        if len(codpontos) == 0:
+            return leiturasPorPonto
+        listaPontos = ",".join(str(int(c)) for c in sorted(set(codpontos)))
+        rows = self.executarConsulta(cur, "SELECT CODPONTO, DIFERENCA FROM Leituras WHERE CODREG="+str(self.id.CODREG)+" AND CODPONTO IN ("+listaPontos+")").fetchall()
+        for row in rows:
+            # mantém o formato de uma linha com uma coluna, como na consulta individual
+            leiturasPorPonto.setdefault(row.CODPONTO, []).append((row.DIFERENCA,))
+        return leiturasPorPonto
+
     # busca as condicoes ambientais no banco de dados PostgreSQL
     def getCondicoesAmbientais(self):
         freq = sorted(self.data.keys())   # lista das frequencias, ordenadas de forma crescente
@@ -883,10 +1222,16 @@ class Resultados(object):
         dataInicial = timestamp[0].strftime("%d/%m/%Y %H:%M")   # data e hora de inicio
         dataFinal = timestamp[-1].strftime("%d/%m/%Y %H:%M")     # data e hora de fim
         # buscar dados das codicoes ambientais no banco de dados
-        conn = psycopg2.connect("dbname={} user={} password={} host={}".format(config['BancoCondicoesAmbientais']['dbname'],config['BancoCondicoesAmbientais']['user'],config['BancoCondicoesAmbientais']['password'],config['BancoCondicoesAmbientais']['host']))
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)    
-        cur.execute("SELECT date,temperature, humidity FROM condicoes_ambientais WHERE date >= '"+dataInicial+"' AND date < '"+dataFinal+"';")
-        rows = cur.fetchall()
+        # a conexão é obtida do pool de conexões persistentes da aplicação
+        def consulta(conn):
+            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            try:
+                cur.execute("SELECT date,temperature, humidity FROM condicoes_ambientais WHERE date >= '"+dataInicial+"' AND date < '"+dataFinal+"';")
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+        rows = poolCondicoesAmbientais().executar(consulta)
         self.temperature = []
         self.humidity = []
         self.date = []
@@ -899,10 +1244,194 @@ class Resultados(object):
         self.temperaturaMedia = "{0:.1f}".format(mean(self.temperature)).replace('.',',')
         self.umidadeMedia = "{0:.1f}".format(mean(self.humidity)).replace('.',',')
         
-        cur.close()
-        conn.close()
         return
 
+# pool de conexões persistentes com um banco de dados PostgreSQL
+class PoolConexoes(object):
+    """ Classe que mantém um pool de conexões persistentes com o banco de dados PostgreSQL
+    O pool pode ser usado por várias threads simultaneamente; quando todas as conexões estão em
+    uso, a thread aguarda a devolução de uma delas. As conexões são abertas sob demanda e as
+    devolvidas ficam ociosas no pool, com o instante do último uso, até serem emprestadas de novo.
+    Atributos:
+    dsn: string de conexão com o banco de dados
+    maxConexoes: quantidade máxima de conexões abertas
+    tempoVerificacao: tempo de ociosidade (s) após o qual a conexão é testada antes do uso
+    """
+
+    def __init__(self, dsn, maxConexoes=4, tempoVerificacao=30):
+        self.dsn = dsn
+        self.maxConexoes = maxConexoes
+        self.tempoVerificacao = tempoVerificacao
+        # conexões ociosas: (conexão, instante do último uso), a usada mais recentemente no final
+        self.ociosas = collections.deque()
+        self.lock = threading.Lock()
+        # limita as conexões abertas: cada conexão emprestada ocupa uma vaga até ser devolvida
+        self.semaforo = threading.BoundedSemaphore(maxConexoes)
+
+    # verifica se a conexão ociosa continua válida
+    # conexões ociosas há mais de tempoVerificacao segundos são testadas com um SELECT 1
+    def conexaoValida(self, conn, ultimoUso):
+        if conn.closed:
+            return False
+        if time.time() - ultimoUso < self.tempoVerificacao:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    # obtém uma conexão válida, reconectando se as conexões ociosas estiverem inativas
+    # aguarda se todas as conexões estiverem em uso; a conexão deve ser devolvida por conexao()
+    def obterConexao(self):
+        self.semaforo.acquire()
+        try:
+            # as conexões ociosas podem ter caído todas (por exemplo, após uma queda da rede):
+            # são descartadas até restar uma válida ou ser aberta uma conexão nova
+            while True:
+                with self.lock:
+                    if len(self.ociosas) == 0:
+                        break
+                    conn, ultimoUso = self.ociosas.pop()
+                if self.conexaoValida(conn, ultimoUso):
+                    return conn
+                self.descartarConexao(conn)
+            # as conexões novas acabaram de ser abertas e não são testadas
+            return psycopg2.connect(self.dsn)
+        except:
+            self.semaforo.release()
+            raise
+
+    def descartarConexao(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    # devolve a conexão ao pool, encerrando a transação aberta pela consulta
+    def devolverConexao(self, conn):
+        if conn.closed:
+            return
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            self.descartarConexao(conn)
+            return
+        with self.lock:
+            self.ociosas.append((conn, time.time()))
+
+    # context manager que empresta uma conexão do pool e a devolve ao final
+    @contextlib.contextmanager
+    def conexao(self):
+        conn = self.obterConexao()
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # conexão perdida: descartar em vez de devolver ao pool
+            self.descartarConexao(conn)
+            raise
+        except:
+            self.devolverConexao(conn)
+            raise
+        else:
+            self.devolverConexao(conn)
+        finally:
+            self.semaforo.release()
+
+    # executa funcao(conn) com uma conexão do pool
+    # se a conexão cair durante a consulta, tenta novamente uma vez com uma nova conexão
+    def executar(self, funcao):
+        try:
+            with self.conexao() as conn:
+                return funcao(conn)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            with self.conexao() as conn:
+                return funcao(conn)
+
+    # fecha as conexões ociosas; as emprestadas são fechadas ao serem devolvidas
+    # o pool continua utilizável e abre novas conexões sob demanda
+    def fechar(self):
+        with self.lock:
+            ociosas = list(self.ociosas)
+            self.ociosas.clear()
+        for conn, ultimoUso in ociosas:
+            self.descartarConexao(conn)
+
+# pool de conexões da aplicação com o banco de condições ambientais
+# é criado na primeira utilização e compartilhado por todas as threads
+_poolCondicoesAmbientais = None
+_poolCondicoesAmbientaisLock = threading.Lock()
+
+def poolCondicoesAmbientais():
+    global _poolCondicoesAmbientais
+    with _poolCondicoesAmbientaisLock:
+        if _poolCondicoesAmbientais is None:
+            dsn = "dbname={} user={} password={} host={}".format(config['BancoCondicoesAmbientais']['dbname'],config['BancoCondicoesAmbientais']['user'],config['BancoCondicoesAmbientais']['password'],config['BancoCondicoesAmbientais']['host'])
+            # o servidor interrompe as consultas que ultrapassam o tempo limite da busca, liberando
+            # a thread de uma busca cancelada
+            if tempoLimiteBusca > 0:
+                dsn += " options='-c statement_timeout={0}'".format(int(tempoLimiteBusca * 1000))
+            _poolCondicoesAmbientais = PoolConexoes(dsn, maxConexoesCondicoesAmbientais, tempoVerificacaoConexao)
+        return _poolCondicoesAmbientais
+
+def fecharPoolCondicoesAmbientais():
+    with _poolCondicoesAmbientaisLock:
+        if _poolCondicoesAmbientais is not None:
+            _poolCondicoesAmbientais.fechar()
+
+# sinais emitidos pelas tarefas executadas em segundo plano
+class SinaisTarefa(QObject):
+    progresso = pyqtSignal(int, str)   # porcentagem, mensagem
+    concluido = pyqtSignal(object)
+    erro = pyqtSignal(str)
+
+# tarefa que busca as leituras e as condições ambientais em segundo plano
+class TarefaBuscarLeituras(QRunnable):
+    """ Tarefa executada no QThreadPool que busca as diferenças ac-dc e as condições ambientais
+    Ao final, emite o sinal concluido com um flag indicando erro na busca das condições ambientais.
+    Atributos:
+    resultados: objeto Resultados do registro aberto
+    valprog: valor programado (VALPROG)
+    faixa792: faixa do 792A (FAIXA792)
+    """
+
+    def __init__(self, resultados, valprog, faixa792):
+        super(TarefaBuscarLeituras, self).__init__()
+        self.resultados = resultados
+        self.valprog = valprog
+        self.faixa792 = faixa792
+        self.sinais = SinaisTarefa()
+        self.cancelada = False
+
+    def cancelar(self):
+        self.cancelada = True
+
+    def run(self):
+        if self.cancelada:
+            return
+        try:
+            self.sinais.progresso.emit(10, "Buscando leituras...")
+            self.resultados.getDiferencas(self.valprog, self.faixa792)
+            if self.cancelada:
+                return
+            self.sinais.progresso.emit(60, "Buscando condições ambientais...")
+            try:
+                self.resultados.getCondicoesAmbientais()
+                erroCondicoesAmbientais = False
+            except Exception:
+                erroCondicoesAmbientais = True
+            if self.cancelada:
+                return
+            self.sinais.progresso.emit(90, "Preenchendo tabela...")
+            self.sinais.concluido.emit(erroCondicoesAmbientais)
+        except Exception as e:
+            if not self.cancelada:
+                self.sinais.erro.emit(str(e))
+
 # classe para plotar as condicoes ambientais (temperatura e umidade) em um gráfico
 class PlotCanvas(FigureCanvas):
  
@@ -0,0 +1,84 @@
+# configuração dos testes: o programa é importado do diretório principal e as configurações
+# são lidas do settings.ini do repositório (sem acesso aos bancos de dados do laboratório)
+import os
+import re
+import sys
+import datetime
+import sqlite3
+import collections
+
+import pytest
+
+diretorioPrograma = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, diretorioPrograma)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# o settings.ini é lido do diretório atual na importação do programa
+diretorioAtual = os.getcwd()
+os.chdir(diretorioPrograma)
+import buscarLeituras
+os.chdir(diretorioAtual)
+
+# aplicação Qt, para os testes que criam janelas
+@pytest.fixture(scope='session')
+def app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+@pytest.fixture(scope='session', autouse=True)
+def configuracoes():
+    # os testes não gravam no cache local do usuário
+    buscarLeituras.cacheAtivo = False
+
+# linhas com os campos pelo nome, como as do pyodbc
+def linhaComCampos(cursor, linha):
+    Linha = collections.namedtuple('Linha', [d[0] for d in cursor.description], rename=True)
+    return Linha(*linha)
+
+# conexão SQLite com o atributo timeout das conexões do pyodbc
+class ConexaoSQLite(sqlite3.Connection):
+    timeout = 0
+
+# pyodbc com o banco SQLite indicado no DBQ da string de conexão (o driver do MS Access só
+# existe no Windows)
+class PyodbcSQLite(object):
+    Error = sqlite3.Error
+
+    @staticmethod
+    def connect(texto):
+        caminho = re.search(r'DBQ=([^;]*)', texto).group(1)
+        conn = sqlite3.connect(caminho, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                               factory=ConexaoSQLite)
+        conn.row_factory = linhaComCampos
+        return conn
+
+# banco de dados SQLite de resultados com um registro (REG001.txt) e três pontos:
+# 1 V e 0,5 V (faixa 2 V) medidos alternadamente, com as frequências de 10 Hz, 1 kHz, 10 kHz
+# e 100 kHz (os CODPONTO de um ponto não são consecutivos), e 10 V (faixa 20 V) com 37
+# frequências; as leituras do CODPONTO n são n, n + 0,1 e n + 0,2
+# o banco é aberto pelo programa com o PyodbcSQLite
+@pytest.fixture
+def bancoResultados(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'resultados.db')
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE Resultados (CODREG INTEGER PRIMARY KEY, NOMEREG TEXT, CODOBJ INTEGER, OPERADOR TEXT);
+        CREATE TABLE Valmed (CODREG INTEGER, CODPONTO INTEGER, CODI INTEGER, FREQ TEXT, VALPROG REAL,
+                             FAIXA792 REAL, DATACAL TIMESTAMP, HORACAL TIMESTAMP);
+        CREATE TABLE Leituras (CODREG INTEGER, CODPONTO INTEGER, VALPROG REAL, DIFERENCA REAL);
+    """)
+    conn.execute("INSERT INTO Resultados VALUES (1, 'REG001.txt', 1001, 'Operador')")
+    pontos = []
+    for freq in ['10  Hz', '1  kHz', '10  kHz', '100  kHz']:
+        pontos += [(1.0, 2.0, freq), (0.5, 2.0, freq)]
+    pontos += [(10.0, 20.0, '{0}  Hz'.format(10 * (i + 1))) for i in range(37)]
+    instante = datetime.datetime(2017, 1, 30, 8, 0)
+    for codponto, (valprog, faixa792, freq) in enumerate(pontos, 1):
+        instante += datetime.timedelta(minutes=5)
+        conn.execute("INSERT INTO Valmed VALUES (1,?,1,?,?,?,?,?)", (codponto, freq, valprog, faixa792, instante, instante))
+        conn.executemany("INSERT INTO Leituras VALUES (1,?,?,?)",
+                         [(codponto, valprog, codponto + i / 10.0) for i in range(3)])
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(buscarLeituras, 'pyodbc', PyodbcSQLite)
+    return caminho
@@ -0,0 +1,85 @@
+# testes do cache local em disco dos resultados (CacheResultados)
+import os
+import time
+
+import pytest
+
+import buscarLeituras
+from buscarLeituras import CacheResultados, Resultados
+
+@pytest.fixture
+def banco(tmp_path):
+    caminho = str(tmp_path / 'Resultados.mdb')
+    with open(caminho, 'wb') as f:
+        f.write(b'banco')
+    return caminho
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheResultados(str(tmp_path / 'cache'), 1024 * 1024)
+
+def test_gravacao_e_leitura(cache, banco):
+    cache.gravar(('registro', 1), banco, {'pontos': [1, 2]})
+    assert cache.ler(('registro', 1), banco) == {'pontos': [1, 2]}
+    assert cache.ler(('registro', 2), banco) is None
+    # a gravação é atômica: não restam arquivos temporários
+    assert [nome for nome in os.listdir(cache.diretorio) if not nome.endswith('.pkl')] == []
+
+def test_banco_modificado(cache, banco):
+    cache.gravar('chave', banco, 1)
+    estado = os.stat(banco)
+    os.utime(banco, (estado.st_atime, estado.st_mtime + 10))
+    assert cache.ler('chave', banco) is None
+    # a entrada desatualizada é removida
+    assert os.listdir(cache.diretorio) == []
+
+def test_tamanho_do_banco_modificado(cache, banco):
+    cache.gravar('chave', banco, 1)
+    estado = os.stat(banco)
+    with open(banco, 'ab') as f:
+        f.write(b'!')
+    # mesma data de modificação, tamanho diferente
+    os.utime(banco, (estado.st_atime, estado.st_mtime))
+    assert cache.ler('chave', banco) is None
+
+def test_nova_versao_do_formato(cache, banco, monkeypatch):
+    cache.gravar('chave', banco, 1)
+    monkeypatch.setattr(CacheResultados, 'versao', CacheResultados.versao + 1)
+    assert cache.ler('chave', banco) is None
+
+def test_remove_as_menos_usadas(cache, banco):
+    cache.gravar('a', banco, 'x' * 1000)
+    tamanho = os.path.getsize(cache.arquivo('a'))
+    cache.tamanhoMaximo = int(tamanho * 2.5)
+    cache.gravar('b', banco, 'y' * 1000)
+    # 'a' foi gravada antes, mas usada depois de 'b'
+    antigo = time.time() - 100
+    os.utime(cache.arquivo('a'), (antigo, antigo))
+    os.utime(cache.arquivo('b'), (antigo + 10, antigo + 10))
+    assert cache.ler('a', banco) is not None
+    cache.gravar('c', banco, 'z' * 1000)
+    assert cache.ler('b', banco) is None
+    assert cache.ler('a', banco) is not None
+    assert cache.ler('c', banco) is not None
+
+def test_limpar(cache, banco):
+    cache.gravar('a', banco, 1)
+    cache.gravar('b', banco, 2)
+    cache.limpar()
+    assert os.listdir(cache.diretorio) == []
+
+# com o cache, o registro e os pontos já buscados não são consultados no banco de dados
+def test_resultados_do_cache(bancoResultados, tmp_path, monkeypatch):
+    monkeypatch.setattr(buscarLeituras, '_cacheResultados', CacheResultados(str(tmp_path / 'cache'), 1024 * 1024))
+    monkeypatch.setattr(buscarLeituras, 'cacheAtivo', True)
+    resultados = Resultados(bancoResultados, 'REG001.txt')
+    resultados.getDiferencas('1', '2')
+    assert resultados.consultas == 2
+    resultados.fechar()
+    resultados = Resultados(bancoResultados, 'REG001.txt')
+    assert resultados.consultasTotal == 0
+    assert resultados.id.OPERADOR == 'Operador'
+    resultados.getDiferencas('1', '2')
+    assert resultados.consultas == 0
+    assert [float(row[0]) for row in resultados.diferencas['100']] == [7.0, 7.1, 7.2]
+    resultados.fechar()
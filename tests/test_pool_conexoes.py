@@ -0,0 +1,160 @@
+# testes do pool de conexões com o banco de condições ambientais, com um psycopg2 simulado
+import threading
+import time
+
+import pytest
+
+import buscarLeituras
+from buscarLeituras import PoolConexoes
+
+class Erro(Exception):
+    pass
+
+class ErroOperacional(Erro):
+    pass
+
+class ErroInterface(Erro):
+    pass
+
+# conexão simulada: 'ativa' indica se o servidor ainda atende a conexão (queda da rede)
+class ConexaoFalsa(object):
+    def __init__(self):
+        self.closed = 0
+        self.ativa = True
+        self.consultas = 0
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def rollback(self):
+        if not self.ativa:
+            raise ErroOperacional("conexão perdida")
+
+    def close(self):
+        self.closed = 1
+
+class CursorFalso(object):
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, parametros=None):
+        if not self.conn.ativa:
+            raise ErroOperacional("conexão perdida")
+        self.conn.consultas += 1
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+class Psycopg2Falso(object):
+    Error = Erro
+    OperationalError = ErroOperacional
+    InterfaceError = ErroInterface
+
+    def __init__(self):
+        self.conexoes = []
+        self.lock = threading.Lock()
+
+    def connect(self, dsn):
+        conn = ConexaoFalsa()
+        with self.lock:
+            self.conexoes.append(conn)
+        return conn
+
+@pytest.fixture
+def psycopg2(monkeypatch):
+    falso = Psycopg2Falso()
+    monkeypatch.setattr(buscarLeituras, 'psycopg2', falso)
+    return falso
+
+def consultar(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT date FROM condicoes_ambientais")
+    return cur.fetchone()
+
+def test_conexao_reutilizada(psycopg2):
+    pool = PoolConexoes('dsn', maxConexoes=2, tempoVerificacao=30)
+    assert pool.executar(consultar) == (1,)
+    assert pool.executar(consultar) == (1,)
+    assert len(psycopg2.conexoes) == 1
+    pool.fechar()
+    assert psycopg2.conexoes[0].closed
+
+def test_conexao_perdida_durante_a_consulta(psycopg2):
+    pool = PoolConexoes('dsn', maxConexoes=2, tempoVerificacao=30)
+    pool.executar(consultar)
+    # a conexão ociosa caiu, mas ainda não precisa ser testada: a consulta falha e é repetida
+    psycopg2.conexoes[0].ativa = False
+    assert pool.executar(consultar) == (1,)
+    assert len(psycopg2.conexoes) == 2
+    assert psycopg2.conexoes[0].closed
+    assert [conn for conn, ultimoUso in pool.ociosas] == [psycopg2.conexoes[1]]
+
+def test_conexao_ociosa_testada_antes_do_uso(psycopg2):
+    pool = PoolConexoes('dsn', maxConexoes=2, tempoVerificacao=0)
+    pool.executar(consultar)
+    psycopg2.conexoes[0].ativa = False
+    chamadas = []
+
+    def consultarUmaVez(conn):
+        chamadas.append(conn)
+        return consultar(conn)
+
+    # o SELECT 1 detecta a queda: a consulta é executada uma única vez, na conexão nova
+    assert pool.executar(consultarUmaVez) == (1,)
+    assert chamadas == [psycopg2.conexoes[1]]
+    assert psycopg2.conexoes[0].closed
+    # a conexão nova não é testada antes do primeiro uso
+    assert psycopg2.conexoes[1].consultas == 1
+
+def test_aguarda_a_devolucao_de_uma_conexao(psycopg2):
+    pool = PoolConexoes('dsn', maxConexoes=1, tempoVerificacao=30)
+    emUso = threading.Event()
+    liberar = threading.Event()
+    concluida = threading.Event()
+
+    def ocupar(conn):
+        emUso.set()
+        liberar.wait(5)
+
+    def segunda():
+        pool.executar(consultar)
+        concluida.set()
+
+    primeira = threading.Thread(target=pool.executar, args=(ocupar,))
+    primeira.start()
+    assert emUso.wait(5)
+    outra = threading.Thread(target=segunda)
+    outra.start()
+    # a segunda consulta aguarda a devolução da única conexão
+    assert not concluida.wait(0.2)
+    liberar.set()
+    assert concluida.wait(5)
+    primeira.join()
+    outra.join()
+    assert len(psycopg2.conexoes) == 1
+
+def test_maximo_de_conexoes(psycopg2):
+    pool = PoolConexoes('dsn', maxConexoes=3, tempoVerificacao=30)
+    lock = threading.Lock()
+    emUso = [0]
+    maximo = [0]
+
+    def ocupar(conn):
+        with lock:
+            emUso[0] += 1
+            maximo[0] = max(maximo[0], emUso[0])
+        time.sleep(0.02)
+        with lock:
+            emUso[0] -= 1
+
+    threads = [threading.Thread(target=pool.executar, args=(ocupar,)) for i in range(9)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert maximo[0] <= 3
+    assert len(psycopg2.conexoes) <= 3
+    assert len(pool.ociosas) == len(psycopg2.conexoes)
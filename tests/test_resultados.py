@@ -0,0 +1,65 @@
+# testes da busca das leituras de um ponto (Resultados.getDiferencas) em um banco SQLite
+import threading
+
+import pytest
+
+import buscarLeituras
+from buscarLeituras import Resultados
+
+@pytest.fixture
+def agrupada(monkeypatch):
+    def configurar(valor):
+        monkeypatch.setattr(buscarLeituras, 'buscaAgrupada', valor)
+    return configurar
+
+# leituras de cada frequência, na ordem das colunas da tabela
+def diferencas(resultados):
+    return [[float(row[0]) for row in leituras] for leituras in resultados.diferencas.values()]
+
+def test_uma_consulta_por_ponto(bancoResultados, agrupada):
+    agrupada(True)
+    resultados = Resultados(bancoResultados, 'REG001.txt')
+    resultados.getDiferencas('0.5', '2')
+    # Valmed e Leituras do ponto, independentemente da quantidade de frequências
+    assert resultados.consultas == 2
+    # apenas as leituras do ponto, embora os CODPONTO dos dois pontos se alternem
+    assert diferencas(resultados) == [[2.0, 2.1, 2.2], [4.0, 4.1, 4.2], [6.0, 6.1, 6.2], [8.0, 8.1, 8.2]]
+
+def test_uma_consulta_por_frequencia(bancoResultados, agrupada):
+    agrupada(False)
+    resultados = Resultados(bancoResultados, 'REG001.txt')
+    resultados.getDiferencas('1', '2')
+    assert resultados.consultas == 1 + 4
+    agrupada(True)
+    resultados.getDiferencas('1', '2')
+    assert resultados.consultas == 2
+    assert diferencas(resultados)[-1] == [7.0, 7.1, 7.2]
+
+def test_ponto_com_muitas_frequencias(bancoResultados, agrupada):
+    agrupada(True)
+    resultados = Resultados(bancoResultados, 'REG001.txt')
+    resultados.getDiferencas('10', '20')
+    assert resultados.consultas == 2
+    assert (resultados.linhas, resultados.colunas) == (3, 37)
+    assert diferencas(resultados)[-1] == [45.0, 45.1, 45.2]
+
+def test_contadores_em_varias_threads(bancoResultados):
+    resultados = Resultados(bancoResultados, 'REG001.txt')
+    total = resultados.consultasTotal
+    contagens = []
+
+    def consultar():
+        conn = buscarLeituras.pyodbc.connect('DBQ=' + bancoResultados)
+        for i in range(200):
+            resultados.executarConsulta(conn.cursor(), "SELECT CODREG FROM Resultados")
+        conn.close()
+        contagens.append(resultados.contagemThread.consultas)
+
+    threads = [threading.Thread(target=consultar) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert resultados.consultasTotal == total + 800
+    # cada thread conta apenas as suas consultas
+    assert contagens == [200] * 4
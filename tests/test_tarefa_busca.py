@@ -0,0 +1,107 @@
+# testes da busca em segundo plano: cancelamento e tempo limite das consultas
+import threading
+
+from PyQt5.QtCore import QRunnable
+
+import buscarLeituras
+from buscarLeituras import TarefaBuscarLeituras
+
+# Resultados simulado: as condições ambientais aguardam 'liberar' (consulta lenta)
+class ResultadosFalso(object):
+    def __init__(self, erroLeituras=None, erroCondicoes=None):
+        self.erroLeituras = erroLeituras
+        self.erroCondicoes = erroCondicoes
+        self.buscando = threading.Event()
+        self.liberar = threading.Event()
+        self.condicoes = False
+
+    def getDiferencas(self, valprog, faixa792):
+        if self.erroLeituras is not None:
+            raise self.erroLeituras
+
+    def getCondicoesAmbientais(self):
+        self.buscando.set()
+        self.liberar.wait(5)
+        if self.erroCondicoes is not None:
+            raise self.erroCondicoes
+        self.condicoes = True
+
+def executar(tarefa):
+    sinais = []
+    tarefa.sinais.concluido.connect(lambda erro: sinais.append(('concluido', erro)))
+    tarefa.sinais.erro.connect(lambda mensagem: sinais.append(('erro', mensagem)))
+    tarefa.run()
+    return sinais
+
+def test_busca_concluida():
+    resultados = ResultadosFalso()
+    resultados.liberar.set()
+    assert executar(TarefaBuscarLeituras(resultados, '1', '2')) == [('concluido', False)]
+    assert resultados.condicoes
+
+def test_erro_nas_condicoes_ambientais():
+    resultados = ResultadosFalso(erroCondicoes=IOError("banco indisponível"))
+    resultados.liberar.set()
+    assert executar(TarefaBuscarLeituras(resultados, '1', '2')) == [('concluido', True)]
+
+def test_erro_nas_leituras():
+    resultados = ResultadosFalso(erroLeituras=LookupError("Ponto não encontrado"))
+    assert executar(TarefaBuscarLeituras(resultados, '1', '2')) == [('erro', "Ponto não encontrado")]
+
+# a tarefa cancelada durante a consulta descarta o resultado
+def test_cancelamento_durante_a_consulta():
+    resultados = ResultadosFalso()
+    tarefa = TarefaBuscarLeituras(resultados, '1', '2')
+    sinais = []
+    tarefa.sinais.concluido.connect(sinais.append)
+    thread = threading.Thread(target=tarefa.run)
+    thread.start()
+    assert resultados.buscando.wait(5)
+    tarefa.cancelar()
+    resultados.liberar.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert sinais == []
+
+def test_tempo_limite_das_consultas(bancoResultados, monkeypatch):
+    monkeypatch.setattr(buscarLeituras, 'tempoLimiteBusca', 2.5)
+    monkeypatch.setattr(buscarLeituras, '_poolCondicoesAmbientais', None)
+    assert buscarLeituras.poolCondicoesAmbientais().dsn.endswith(" options='-c statement_timeout=2500'")
+    resultados = buscarLeituras.Resultados(bancoResultados, 'REG001.txt')
+    assert resultados.conn.timeout == 3
+    resultados.fechar()
+    # sem tempo limite
+    monkeypatch.setattr(buscarLeituras, 'tempoLimiteBusca', 0)
+    monkeypatch.setattr(buscarLeituras, '_poolCondicoesAmbientais', None)
+    assert 'statement_timeout' not in buscarLeituras.poolCondicoesAmbientais().dsn
+    resultados = buscarLeituras.Resultados(bancoResultados, 'REG001.txt')
+    assert resultados.conn.timeout == 0
+    resultados.fechar()
+
+class TarefaBloqueada(QRunnable):
+    def __init__(self, liberar):
+        super(TarefaBloqueada, self).__init__()
+        self.liberar = liberar
+
+    def run(self):
+        self.liberar.wait(5)
+
+# a nova busca aguarda a consulta da busca cancelada, e a interface informa a espera
+def test_busca_aguardando_a_anterior(app):
+    janela = buscarLeituras.App()
+    resultados = ResultadosFalso()
+    resultados.liberar.set()
+    janela.resultados = resultados
+    liberar = threading.Event()
+    janela.threadPool.start(TarefaBloqueada(liberar))
+    # o método é acessado pela classe: o atributo buscarLeituras da janela é o botão
+    buscarLeituras.App.buscarLeituras(janela)
+    assert janela.progressoBusca.format() == "Aguardando o fim da consulta anterior..."
+    janela.cancelarBusca()
+    liberar.set()
+    janela.threadPool.waitForDone(5000)
+    buscarLeituras.App.buscarLeituras(janela)
+    assert janela.progressoBusca.format() == "Aguardando..."
+    janela.cancelarBusca()
+    janela.threadPool.waitForDone(5000)
+    janela.close()